@@ -0,0 +1,127 @@
+from contextlib import closing
+
+from pichu import sql_builder
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class BlobTooLarge(Exception):
+    pass
+
+
+class BlobIO(object):
+    """Stream a blob field of a single row in chunks.
+
+    Uses the engine's incremental blob handle when available, otherwise
+    falls back to `substr` reads and appending writes. Every appending write
+    rewrites the whole value, so without blob handles writes are limited
+    to `MaxFallbackWriteSize` bytes.
+    """
+
+    ChunkSize = 64 * 1024
+    MaxFallbackWriteSize = 16 * 1024 * 1024
+
+    def __init__(self, engine, model_meta, attr, pk, chunk_size=None):
+        super(BlobIO, self).__init__()
+        if attr not in {f.attr for f in model_meta.fields}:
+            raise sql_builder.SQLValueError(attr)
+        if model_meta.pk is None:
+            raise sql_builder.SQLValueError(
+                "primary key field not found in table %s" % model_meta.table
+            )
+        self.engine = engine
+        self.model_meta = model_meta
+        self.field = {f.attr: f for f in model_meta.fields}[attr]
+        self.pk = pk
+        self.chunk_size = chunk_size or self.ChunkSize
+
+    def _raw(self, sql, *parameters):
+        return sql_builder.RawSQLBuilder(
+            self.model_meta, sql % {
+                "table": self.model_meta.table,
+                "column": self.field.column,
+                "pk": self.model_meta.pk.column,
+            }, parameters,
+        )
+
+    def _locate(self):
+        for rowid, size in self.engine.execute(self._raw(
+            'SELECT rowid, length("%(column)s") FROM %(table)s '
+            'WHERE "%(pk)s"=?;', self.pk,
+        )):
+            return rowid, size or 0
+        raise BlobNotFound("%s %r" % (self.model_meta.table, self.pk))
+
+    def size(self):
+        return self._locate()[1]
+
+    def iter_chunks(self):
+        """Yield the blob content as bytes chunks."""
+        rowid, size = self._locate()
+        if self.engine.supports_blob_io and size:
+            handle = self.engine.open_blob(
+                self.model_meta.table, self.field.column, rowid,
+            )
+            with closing(handle):
+                while True:
+                    chunk = handle.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            return
+
+        for offset in range(0, size, self.chunk_size):
+            for chunk, in self.engine.execute(self._raw(
+                'SELECT substr("%(column)s", ?, ?) FROM %(table)s '
+                'WHERE rowid=?;', offset + 1, self.chunk_size, rowid,
+            )):
+                yield bytes(chunk)
+
+    def read_into(self, stream):
+        """Copy the blob into a writable binary stream, return its size."""
+        size = 0
+        for chunk in self.iter_chunks():
+            stream.write(chunk)
+            size += len(chunk)
+        return size
+
+    def write_from(self, stream, size):
+        """Replace the blob with `size` bytes read from a binary stream."""
+        rowid, _ = self._locate()
+        incremental = self.engine.supports_blob_io and size > 0
+        if not incremental and size > self.MaxFallbackWriteSize:
+            raise BlobTooLarge(
+                "%s bytes without incremental blob I/O" % size
+            )
+        with self.engine.transaction():
+            self.engine.execute_write(self._raw(
+                'UPDATE %(table)s SET "%(column)s"=zeroblob(?) '
+                'WHERE rowid=?;', size if incremental else 0, rowid,
+            ))
+            if incremental:
+                handle = self.engine.open_blob(
+                    self.model_meta.table, self.field.column, rowid,
+                    readonly=False,
+                )
+                with closing(handle):
+                    self._copy(stream, size, handle.write)
+                return
+
+            self._copy(stream, size, lambda chunk: self.engine.execute_write(
+                self._raw(
+                    'UPDATE %(table)s SET "%(column)s"='
+                    'CAST("%(column)s" || ? AS BLOB) WHERE rowid=?;',
+                    chunk, rowid,
+                )
+            ))
+
+    def _copy(self, stream, size, write):
+        remaining = size
+        while remaining > 0:
+            chunk = stream.read(min(self.chunk_size, remaining))
+            if not chunk:
+                raise ValueError("stream ended %s bytes early" % remaining)
+            write(chunk)
+            remaining -= len(chunk)
@@ -1,28 +1,80 @@
-from contextlib import closing
+from contextlib import closing, contextmanager
+
+from pichu.write_behind import WriteBehindQueue
 
 
 class BaseEngine(object):
 
     def __init__(self):
         super(BaseEngine, self).__init__()
+        self.write_behind = None
 
     def get_cursor(self, *args, **kwargs):
         raise NotImplemented
 
+    def _execute_on_cursor(self, cursor, sql_builder):
+        cursor.execute(
+            sql_builder._build_sql(),
+            sql_builder._build_parameters(),
+        )
+
     def execute(self, sql_builder):
         with closing(self.get_cursor()) as cursor:
-            cursor.execute(
-                sql_builder._build_sql(),
-                sql_builder._build_parameters(),
-            )
+            self._execute_on_cursor(cursor, sql_builder)
             while True:
                 result = cursor.fetchone()
-                import pdb
-                pdb.set_trace()
                 if result is None:
                     break
                 yield sql_builder._parse_db_result(result)
 
+    def execute_raw(self, sql_builder, batch_size=1000):
+        """Yield lists of raw database rows without parsing them."""
+        with closing(self.get_cursor()) as cursor:
+            self._execute_on_cursor(cursor, sql_builder)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+    def execute_write(self, sql_builder):
+        """Execute a statement which returns no rows, return the rowcount."""
+        with closing(self.get_cursor()) as cursor:
+            self._execute_on_cursor(cursor, sql_builder)
+            return cursor.rowcount
+
+    def transaction(self):
+        raise NotImplementedError()
+
+    def close(self):
+        """Release the engine, draining its write-behind queue first."""
+        if self.write_behind is not None and not self.write_behind.closed:
+            self.write_behind.close()
+
+    def is_transient_error(self, error):
+        """Whether a failed write may succeed when retried as is."""
+        return False
+
+    def enable_write_behind(self, connection_factory, **kwargs):
+        """Start a background write-behind queue on this engine.
+
+        The queue writes through its own connection made by
+        `connection_factory`, so its transactions never commit or roll
+        back work done on this engine.
+        """
+        if self.write_behind is None or self.write_behind.closed:
+            self.write_behind = WriteBehindQueue(
+                SingleConnectionEngine(connection_factory()), **kwargs
+            )
+        return self.write_behind
+
+    @property
+    def supports_blob_io(self):
+        return False
+
+    def open_blob(self, table, column, rowid, readonly=True):
+        raise NotImplementedError()
+
 
 class SingleConnectionEngine(BaseEngine):
 
@@ -32,3 +84,33 @@ class SingleConnectionEngine(BaseEngine):
 
     def get_cursor(self):
         return self.connection.cursor()
+
+    def close(self):
+        super(SingleConnectionEngine, self).close()
+        self.connection.close()
+
+    def is_transient_error(self, error):
+        operational_error = getattr(self.connection, "OperationalError", ())
+        if not isinstance(error, operational_error):
+            return False
+        message = str(error).lower()
+        return "locked" in message or "busy" in message
+
+    @contextmanager
+    def transaction(self):
+        try:
+            yield self
+        except Exception:
+            self.connection.rollback()
+            raise
+        else:
+            self.connection.commit()
+
+    @property
+    def supports_blob_io(self):
+        return hasattr(self.connection, "blobopen")
+
+    def open_blob(self, table, column, rowid, readonly=True):
+        return self.connection.blobopen(
+            table, column, rowid, readonly=readonly,
+        )
@@ -0,0 +1,121 @@
+import csv
+import gzip
+import io
+import json
+
+import six
+
+
+class BaseExporter(object):
+    """Stream the result of a select builder into a file.
+
+    Rows are fetched in batches and converted field by field, model
+    instances are never built so memory stays flat on large tables.
+    """
+
+    def __init__(
+        self, engine, sql_builder, batch_size=1000, compress=False,
+        encoding="utf-8", buffer_size=io.DEFAULT_BUFFER_SIZE,
+        progress=None,
+    ):
+        super(BaseExporter, self).__init__()
+        self.engine = engine
+        self.sql_builder = sql_builder
+        self.batch_size = batch_size
+        self.compress = compress
+        self.encoding = encoding
+        self.buffer_size = buffer_size
+        self.progress = progress
+
+    @property
+    def fields(self):
+        return self.sql_builder.select_fields
+
+    def _open(self, target):
+        if isinstance(target, six.string_types):
+            if self.compress:
+                stream = gzip.open(target, "wb")
+            else:
+                stream = io.open(target, "wb", buffering=self.buffer_size)
+        elif self.compress:
+            stream = gzip.GzipFile(fileobj=target, mode="wb")
+        else:
+            return target, False
+
+        if self.compress:
+            stream = io.BufferedWriter(stream, self.buffer_size)
+
+        text_stream = io.TextIOWrapper(
+            stream, encoding=self.encoding, newline="",
+        )
+        return text_stream, True
+
+    def _convert_value(self, field, value):
+        if value is None:
+            return value
+        return field.to_text_value(field.to_model_value(value))
+
+    def _convert_row(self, row):
+        return [
+            self._convert_value(f, v)
+            for f, v in zip(self.fields, row)
+        ]
+
+    def _write_header(self, stream):
+        pass
+
+    def _write_rows(self, stream, rows):
+        raise NotImplementedError()
+
+    def export(self, target):
+        """Write all rows to `target`, a path or a text stream.
+
+        When `compress` is set a stream target must be binary.
+        Returns the number of exported rows.
+        """
+        stream, owned = self._open(target)
+        count = 0
+        try:
+            self._write_header(stream)
+            for rows in self.engine.execute_raw(
+                self.sql_builder, self.batch_size,
+            ):
+                self._write_rows(stream, [
+                    self._convert_row(r) for r in rows
+                ])
+                count += len(rows)
+                if self.progress:
+                    self.progress(count)
+        finally:
+            if owned:
+                stream.close()
+            else:
+                stream.flush()
+        return count
+
+
+class CSVExporter(BaseExporter):
+
+    def __init__(self, *args, **kwargs):
+        self.with_header = kwargs.pop("with_header", True)
+        self.dialect = kwargs.pop("dialect", "excel")
+        super(CSVExporter, self).__init__(*args, **kwargs)
+
+    def _write_header(self, stream):
+        if self.with_header:
+            csv.writer(stream, self.dialect).writerow([
+                f.attr for f in self.fields
+            ])
+
+    def _write_rows(self, stream, rows):
+        csv.writer(stream, self.dialect).writerows(rows)
+
+
+class JSONLinesExporter(BaseExporter):
+
+    def _write_rows(self, stream, rows):
+        attrs = [f.attr for f in self.fields]
+        stream.write("".join(
+            "%s\n" % json.dumps(dict(zip(attrs, r)), sort_keys=True)
+            for r in rows
+        ))
@@ -0,0 +1,140 @@
+import csv
+import gzip
+import io
+import json
+from itertools import islice
+
+import six
+
+from pichu import sql_builder
+
+
+class BaseImporter(object):
+    """Stream records from a file into a model table.
+
+    Records are mapped to field attrs, converted a batch at a time and
+    inserted in one transaction per batch. `checkpoint` is called with the
+    number of records consumed after every committed batch, passing that
+    value back as `offset` resumes an interrupted load.
+    """
+
+    def __init__(
+        self, engine, model_meta, columns=None, batch_size=1000,
+        compress=False, encoding="utf-8", checkpoint=None, fast=False,
+    ):
+        super(BaseImporter, self).__init__()
+        self.engine = engine
+        self.model_meta = model_meta
+        self.batch_size = batch_size
+        self.compress = compress
+        self.encoding = encoding
+        self.checkpoint = checkpoint
+        self.fast = fast
+
+        if columns is None:
+            columns = {f.attr: f.attr for f in model_meta.fields}
+        self.field_mappings = {f.attr: f for f in model_meta.fields}
+        for attr in columns.values():
+            if attr not in self.field_mappings:
+                raise sql_builder.SQLValueError(attr)
+        self.columns = columns
+
+    def _open(self, source):
+        if isinstance(source, six.string_types):
+            if self.compress:
+                return gzip.open(
+                    source, "rt", encoding=self.encoding, newline="",
+                ), True
+            return io.open(source, encoding=self.encoding, newline=""), True
+        elif self.compress:
+            return io.TextIOWrapper(
+                gzip.GzipFile(fileobj=source, mode="rb"),
+                encoding=self.encoding, newline="",
+            ), True
+        return source, False
+
+    def _iter_records(self, stream):
+        raise NotImplementedError()
+
+    def _map_record(self, record):
+        return {
+            attr: self.field_mappings[attr].from_text_value(record[column])
+            for column, attr in self.columns.items()
+            if column in record
+        }
+
+    def _insert_batch(self, records):
+        builder = sql_builder.InsertSQLBuilder(self.model_meta)
+        builder.insert_many([self._map_record(r) for r in records])
+        with self.engine.transaction():
+            for chunk in builder.split():
+                self.engine.execute_write(chunk)
+
+    def _drop_indexes(self, dropped):
+        """Drop non-unique indexes, recording each one into `dropped`.
+
+        Unique indexes are kept so duplicates are still rejected.
+        """
+        indexes = list(self.engine.execute(
+            sql_builder.ListIndexSQLBuilder(self.model_meta)
+        ))
+        for name, sql in indexes:
+            if sql.upper().startswith("CREATE UNIQUE"):
+                continue
+            with self.engine.transaction():
+                self.engine.execute_write(
+                    sql_builder.DropIndexSQLBuilder(self.model_meta, name)
+                )
+            dropped.append((name, sql))
+
+    def _create_indexes(self, indexes):
+        with self.engine.transaction():
+            for _, sql in indexes:
+                self.engine.execute_write(
+                    sql_builder.RawSQLBuilder(self.model_meta, sql)
+                )
+
+    def load(self, source, offset=0):
+        """Load records from `source`, a path or a text stream.
+
+        When `compress` is set a stream source must be binary.
+        Returns the offset reached, i.e. the number of consumed records.
+        """
+        stream, owned = self._open(source)
+        indexes = []
+        try:
+            if self.fast:
+                self._drop_indexes(indexes)
+            records = islice(self._iter_records(stream), offset, None)
+            while True:
+                batch = list(islice(records, self.batch_size))
+                if not batch:
+                    break
+                self._insert_batch(batch)
+                offset += len(batch)
+                if self.checkpoint:
+                    self.checkpoint(offset)
+        finally:
+            if indexes:
+                self._create_indexes(indexes)
+            if owned:
+                stream.close()
+        return offset
+
+
+class CSVImporter(BaseImporter):
+
+    def __init__(self, *args, **kwargs):
+        self.dialect = kwargs.pop("dialect", "excel")
+        super(CSVImporter, self).__init__(*args, **kwargs)
+
+    def _iter_records(self, stream):
+        return csv.DictReader(stream, dialect=self.dialect)
+
+
+class JSONLinesImporter(BaseImporter):
+
+    def _iter_records(self, stream):
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
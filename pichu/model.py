@@ -1,3 +1,5 @@
+import base64
+
 import six
 from copy import deepcopy
 import operator
@@ -15,6 +17,10 @@ class ModelNameConflictError(Exception):
     pass
 
 
+class DeferredFieldNotLoaded(AttributeError):
+    pass
+
+
 class ModelMetaAttrs(dict):
 
     def __init__(self, **kwargs):
@@ -22,6 +28,7 @@ class ModelMetaAttrs(dict):
         self.fields = []
         self.model = None
         self.pk = None
+        self.uniques = ()
         self.update(kwargs)
 
     def __setattr__(self, name, value):
@@ -40,10 +47,22 @@ class BaseFieldType(object):
         self.attr = None
         self.column = None
         self.is_primary_key = False
+        self.is_unique = False
+        self.deferred = False
 
         for attr, value in kwargs.items():
             setattr(self, attr, value)
 
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if self.deferred:
+            raise DeferredFieldNotLoaded(
+                "deferred field %s is not loaded, select it with undefer()"
+                % self.attr
+            )
+        raise AttributeError(self.attr)
+
     def __str__(self):
         return "<{type} {self.attr} at {id}>".format(
             type=self.__class__.__name__, id=id(self),
@@ -56,6 +75,13 @@ class BaseFieldType(object):
     def to_model_value(self, value):
         raise NotImplementedError()
 
+    def to_text_value(self, value):
+        """Encode a model value for text formats such as CSV or JSON."""
+        return value
+
+    def from_text_value(self, value):
+        return value
+
 
 class ModelMeta(type):
     GlobalModels = {}
@@ -104,10 +130,11 @@ class ModelMeta(type):
     def setup_meta_attrs(cls, name, bases, attrs):
         fields = ModelMeta.make_fields_from_attrs(attrs)
         pk = ModelMeta.find_primary_key(fields)
+        uniques = tuple(f for f in fields if f.is_unique)
         table = ModelMeta.get_model_table(cls, name, attrs)
 
         attrs["X"] = ModelMetaAttrs(
-            fields=fields, table=table, pk=pk,
+            fields=fields, table=table, pk=pk, uniques=uniques,
         )
 
     @staticmethod
@@ -138,8 +165,22 @@ class BaseModel(six.with_metaclass(ModelMeta, object)):
                 value = kwargs.pop(f.attr)
             elif hasattr(f, "default"):
                 value = f.default
+            elif f.deferred:
+                continue
             setattr(self, f.attr, f.to_model_value(value))
 
+    @classmethod
+    def _from_database(cls, **values):
+        """Build a model from converted database values.
+
+        Fields which were not selected are left unset, defaults are not
+        applied.
+        """
+        model = cls.__new__(cls)
+        for attr, value in values.items():
+            setattr(model, attr, value)
+        return model
+
     @property
     def pk(self):
         pk_field = self.X.pk
@@ -184,7 +225,7 @@ class TextFieldType(BaseFieldType):
         super(TextFieldType, self).__init__(**kwargs)
 
     def to_database_value(self, value):
-        if isinstance(value, unicode):
+        if six.PY2 and isinstance(value, six.text_type):
             return value.encode(self.encoding)
         return value
 
@@ -192,3 +233,41 @@ class TextFieldType(BaseFieldType):
         if isinstance(value, bytes):
             return value.decode(self.encoding)
         return value
+
+
+class BlobFieldType(BaseFieldType):
+    """Binary field, hydrated as a zero-copy memoryview.
+
+    Blob fields are deferred by default, selects skip them unless they are
+    undeferred and reading an unloaded one raises `DeferredFieldNotLoaded`,
+    use `pichu.blob.BlobIO` to stream large values.
+    """
+    DBType = "BLOB"
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("deferred", True)
+        super(BlobFieldType, self).__init__(**kwargs)
+
+    def to_database_value(self, value):
+        return value
+
+    def to_model_value(self, value):
+        if value is None or isinstance(value, memoryview):
+            return value
+        if isinstance(value, six.text_type):
+            value = value.encode("utf-8")
+        return memoryview(value)
+
+    def to_text_value(self, value):
+        if value is None:
+            return value
+        return base64.b64encode(value).decode("ascii")
+
+    def from_text_value(self, value):
+        # CSV writes NULL as an empty cell, so an empty value reads back
+        # as NULL, an empty blob round-trips as NULL as well
+        if not isinstance(value, (six.text_type, six.binary_type)):
+            return value
+        if not value:
+            return None
+        return base64.b64decode(value)
@@ -1,4 +1,4 @@
-from copy import deepcopy
+from copy import copy, deepcopy
 from collections import namedtuple, OrderedDict
 
 from pichu.utils import chaining_method
@@ -144,6 +144,21 @@ class SelectSQLBuilder(BaseSQLBuilder, WherePartSQLBuilderMixin):
         self.limit_count = None
         self.order_by_fields = None
         self.sort_order_type = None
+        self.undeferred_fields = set()
+
+    @property
+    def select_fields(self):
+        return tuple(
+            f for f in self.model_meta.fields
+            if not f.deferred or f.attr in self.undeferred_fields
+        )
+
+    @chaining_method
+    def undefer(self, *attrs):
+        for attr in attrs:
+            if attr not in self.field_mappings:
+                raise SQLValueError(attr)
+            self.undeferred_fields.add(attr)
 
     @chaining_method
     def limit(self, count, offset=None):
@@ -171,15 +186,15 @@ class SelectSQLBuilder(BaseSQLBuilder, WherePartSQLBuilderMixin):
     def _parse_db_result(self, result):
         values = {
             f.attr: f.to_model_value(v)
-            for f, v in zip(self.model_meta.fields, result)
+            for f, v in zip(self.select_fields, result)
         }
-        return self.model_meta.model(**values)
+        return self.model_meta.model._from_database(**values)
 
     def _build_sql(self):
         sql_parts = ["SELECT"]
         sql_parts.append(", ".join([
             '"%s"' % f.column
-            for f in self.model_meta.fields
+            for f in self.select_fields
         ]))
         sql_parts.extend([
             "FROM", self.model_meta.table,
@@ -211,6 +226,7 @@ class SelectSQLBuilder(BaseSQLBuilder, WherePartSQLBuilderMixin):
 
 
 class InsertSQLBuilder(BaseSQLBuilder):
+    MaxParameters = 999
 
     def __init__(self, model_meta):
         super(InsertSQLBuilder, self).__init__(model_meta)
@@ -229,11 +245,43 @@ class InsertSQLBuilder(BaseSQLBuilder):
                 raise SQLValueError(f.attr)
         self.insert_values.append(values)
 
-    def _build_sql(self):
+    @chaining_method
+    def insert_many(self, rows):
+        """Insert a batch of attr-keyed dicts, converting column by column."""
+        columns = []
+        for f in self.model_meta.fields:
+            convert = f.to_database_value
+            has_default = hasattr(f, "default")
+            values = []
+            for row in rows:
+                if f.attr in row:
+                    values.append(convert(row[f.attr]))
+                elif has_default:
+                    values.append(f.default)
+                else:
+                    raise SQLValueError(f.attr)
+            columns.append(values)
+        self.insert_values.extend(list(v) for v in zip(*columns))
+
+    def split(self, chunk_size=None):
+        """Yield copies of this builder holding at most `chunk_size` rows.
+
+        By default chunks are sized to stay under `MaxParameters`.
+        """
+        if chunk_size is None:
+            chunk_size = max(
+                1, self.MaxParameters // len(self.model_meta.fields)
+            )
+        for i in range(0, len(self.insert_values), chunk_size):
+            builder = copy(self)
+            builder.insert_values = self.insert_values[i:i + chunk_size]
+            yield builder
+
+    def _build_insert_sql_parts(self, sql_parts):
         if not self.insert_values:
             raise SQLValueError("insert value is empty")
 
-        sql_parts = ["INSERT", "INTO", self.model_meta.table]
+        sql_parts.extend(["INSERT", "INTO", self.model_meta.table])
         sql_parts.append("(%s)" % ", ".join([
             '"%s"' % f.column
             for f in self.model_meta.fields
@@ -246,6 +294,10 @@ class InsertSQLBuilder(BaseSQLBuilder):
         sql_parts.append(", ".join(
             value_statement for i in self.insert_values
         ))
+
+    def _build_sql(self):
+        sql_parts = []
+        self._build_insert_sql_parts(sql_parts)
         return "%s;" % " ".join(sql_parts)
 
     def _build_parameters(self):
@@ -255,6 +307,93 @@ class InsertSQLBuilder(BaseSQLBuilder):
         return tuple(params)
 
 
+class UpsertSQLBuilder(InsertSQLBuilder):
+    """Insert rows, updating the existing row on conflict.
+
+    Unless `do_update` is called, only the columns supplied for every
+    inserted row are overwritten, columns filled from field defaults keep
+    their stored value.
+    """
+
+    def __init__(self, model_meta):
+        super(UpsertSQLBuilder, self).__init__(model_meta)
+        self.conflict_fields = None
+        self.update_fields = None
+        self.supplied_attrs = None
+
+    def _record_supplied(self, attrs):
+        attrs = frozenset(attrs)
+        if self.supplied_attrs is None:
+            self.supplied_attrs = attrs
+        else:
+            self.supplied_attrs = self.supplied_attrs & attrs
+
+    @chaining_method
+    def insert(self, **kwargs):
+        self._record_supplied(kwargs)
+        super(UpsertSQLBuilder, self).insert(**kwargs)
+
+    @chaining_method
+    def insert_many(self, rows):
+        for row in rows:
+            self._record_supplied(row)
+        super(UpsertSQLBuilder, self).insert_many(rows)
+
+    def _get_fields(self, attrs):
+        fields = []
+        for attr in attrs:
+            if attr not in self.field_mappings:
+                raise SQLValueError(attr)
+            fields.append(self.field_mappings[attr])
+        return fields
+
+    @chaining_method
+    def on_conflict(self, *attrs):
+        self.conflict_fields = self._get_fields(attrs)
+
+    @chaining_method
+    def do_update(self, *attrs):
+        """Overwrite only `attrs` on conflict, no attrs means do nothing."""
+        self.update_fields = self._get_fields(attrs)
+
+    def _get_conflict_fields(self):
+        if self.conflict_fields:
+            return self.conflict_fields
+        if self.model_meta.pk is not None:
+            return [self.model_meta.pk]
+        if len(self.model_meta.uniques) == 1:
+            return list(self.model_meta.uniques)
+        raise SQLValueError("conflict target is ambiguous")
+
+    def _get_update_fields(self, conflict_fields):
+        if self.update_fields is not None:
+            return self.update_fields
+        supplied = self.supplied_attrs or frozenset()
+        return [
+            f for f in self.model_meta.fields
+            if f not in conflict_fields and f.attr in supplied
+        ]
+
+    def _build_sql(self):
+        sql_parts = []
+        self._build_insert_sql_parts(sql_parts)
+
+        conflict_fields = self._get_conflict_fields()
+        sql_parts.extend(["ON CONFLICT", "(%s)" % ", ".join(
+            '"%s"' % f.column for f in conflict_fields
+        )])
+
+        update_fields = self._get_update_fields(conflict_fields)
+        if update_fields:
+            sql_parts.extend(["DO UPDATE SET", ", ".join(
+                '"%s"=excluded."%s"' % (f.column, f.column)
+                for f in update_fields
+            )])
+        else:
+            sql_parts.append("DO NOTHING")
+        return "%s;" % " ".join(sql_parts)
+
+
 class UpdateSQLBuilder(BaseSQLBuilder, WherePartSQLBuilderMixin):
 
     def __init__(self, model_meta):
@@ -307,11 +446,52 @@ class CreateTableSQLBuilder(BaseSQLBuilder):
         for f in self.model_meta.fields:
             if f.is_primary_key:
                 field = '"%s" %s %s' % (f.column, f.DBType, "PRIMARY KEY")
+            elif f.is_unique:
+                field = '"%s" %s %s' % (f.column, f.DBType, "UNIQUE")
             else:
                 field = '"%s" %s' % (f.column, f.DBType)
             if hasattr(f, "default"):
-                field = "%s DEFAULT %r" % (field, f.default)
+                if f.default is None:
+                    field = "%s DEFAULT NULL" % field
+                else:
+                    field = "%s DEFAULT %r" % (field, f.default)
             field_parts.append(field)
 
         sql_parts.extend(["(", ", ".join(field_parts), ")"])
         return "%s;" % " ".join(sql_parts)
+
+
+class ListIndexSQLBuilder(BaseSQLBuilder):
+
+    def _build_sql(self):
+        return (
+            "SELECT name, sql FROM sqlite_master WHERE type='index' "
+            "AND tbl_name=? AND sql IS NOT NULL;"
+        )
+
+    def _build_parameters(self):
+        return (self.model_meta.table,)
+
+
+class DropIndexSQLBuilder(BaseSQLBuilder):
+
+    def __init__(self, model_meta, index):
+        super(DropIndexSQLBuilder, self).__init__(model_meta)
+        self.index = index
+
+    def _build_sql(self):
+        return 'DROP INDEX IF EXISTS "%s";' % self.index
+
+
+class RawSQLBuilder(BaseSQLBuilder):
+
+    def __init__(self, model_meta, sql, parameters=()):
+        super(RawSQLBuilder, self).__init__(model_meta)
+        self.sql = sql
+        self.parameters = tuple(parameters)
+
+    def _build_sql(self):
+        return self.sql
+
+    def _build_parameters(self):
+        return self.parameters
@@ -0,0 +1,69 @@
+import io
+import os
+import sqlite3
+from unittest import TestCase
+
+from pichu import blob, sql_builder
+from pichu.engine import SingleConnectionEngine
+from .utils import TestBlobModel
+
+
+class FallbackEngine(SingleConnectionEngine):
+
+    @property
+    def supports_blob_io(self):
+        return False
+
+
+class TestBlobIO(TestCase):
+    EngineClass = SingleConnectionEngine
+
+    def setUp(self):
+        self.engine = self.EngineClass(sqlite3.connect(":memory:"))
+        self.engine.execute_write(
+            sql_builder.CreateTableSQLBuilder(TestBlobModel.X)
+        )
+        with self.engine.transaction():
+            self.engine.execute_write(
+                sql_builder.InsertSQLBuilder(TestBlobModel.X).insert(id=1)
+            )
+        self.blob_io = blob.BlobIO(
+            self.engine, TestBlobModel.X, "data", 1, chunk_size=7,
+        )
+
+    def test_write_and_read(self):
+        content = os.urandom(100)
+        self.blob_io.write_from(io.BytesIO(content), len(content))
+        self.assertEqual(self.blob_io.size(), 100)
+
+        chunks = list(self.blob_io.iter_chunks())
+        self.assertEqual(len(chunks), 15)
+        self.assertEqual(b"".join(chunks), content)
+
+        stream = io.BytesIO()
+        self.assertEqual(self.blob_io.read_into(stream), 100)
+        self.assertEqual(stream.getvalue(), content)
+
+        model = next(self.engine.execute(
+            sql_builder.SelectSQLBuilder(TestBlobModel.X).undefer("data")
+        ))
+        self.assertIsInstance(model.data, memoryview)
+        self.assertEqual(model.data.tobytes(), content)
+
+    def test_short_stream(self):
+        with self.assertRaises(ValueError):
+            self.blob_io.write_from(io.BytesIO(b"abc"), 10)
+        self.assertEqual(self.blob_io.size(), 0)
+
+    def test_not_found(self):
+        with self.assertRaises(blob.BlobNotFound):
+            blob.BlobIO(self.engine, TestBlobModel.X, "data", 2).size()
+
+
+class TestFallbackBlobIO(TestBlobIO):
+    EngineClass = FallbackEngine
+
+    def test_too_large(self):
+        self.blob_io.MaxFallbackWriteSize = 10
+        with self.assertRaises(blob.BlobTooLarge):
+            self.blob_io.write_from(io.BytesIO(b"x" * 11), 11)
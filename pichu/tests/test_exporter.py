@@ -0,0 +1,122 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import TestCase
+
+from pichu import exporter, sql_builder
+from pichu.engine import SingleConnectionEngine
+from .utils import TestModel
+
+
+class ExporterTestCase(TestCase):
+
+    def setUp(self):
+        self.engine = SingleConnectionEngine(sqlite3.connect(":memory:"))
+        cursor = self.engine.get_cursor()
+        cursor.execute(
+            sql_builder.CreateTableSQLBuilder(TestModel.X)._build_sql()
+        )
+        cursor.executemany(
+            'INSERT INTO %s ("id", "name", "value") VALUES (?, ?, ?);'
+            % TestModel.X.table,
+            [(i, "name%s" % i, i / 2.0) for i in range(10)],
+        )
+        cursor.close()
+        self.builder = sql_builder.SelectSQLBuilder(TestModel.X)
+        self.builder.order_by("id")
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+
+class TestCSVExporter(ExporterTestCase):
+
+    def test_export_stream(self):
+        progress = []
+        stream = io.StringIO()
+        count = exporter.CSVExporter(
+            self.engine, self.builder, batch_size=3,
+            progress=progress.append,
+        ).export(stream)
+        self.assertEqual(count, 10)
+        self.assertListEqual(progress, [3, 6, 9, 10])
+
+        rows = list(csv.reader(io.StringIO(stream.getvalue())))
+        self.assertListEqual(rows[0], ["id", "name", "value"])
+        self.assertListEqual(rows[1], ["0", "name0", "0.0"])
+        self.assertListEqual(rows[-1], ["9", "name9", "4.5"])
+        self.assertEqual(len(rows), 11)
+
+    def test_export_null(self):
+        self.engine.get_cursor().execute(
+            'INSERT INTO %s ("id", "name", "value") VALUES (?, ?, ?);'
+            % TestModel.X.table, (10, None, None),
+        )
+        stream = io.StringIO()
+        exporter.CSVExporter(self.engine, self.builder).export(stream)
+        rows = list(csv.reader(io.StringIO(stream.getvalue())))
+        self.assertListEqual(rows[-1], ["10", "", ""])
+
+    def test_export_gzip_path(self):
+        path = os.path.join(self.tempdir, "export.csv.gz")
+        exporter.CSVExporter(
+            self.engine, self.builder, compress=True, with_header=False,
+        ).export(path)
+        with gzip.open(path, "rt") as fp:
+            rows = list(csv.reader(fp))
+        self.assertEqual(len(rows), 10)
+        self.assertListEqual(rows[2], ["2", "name2", "1.0"])
+
+
+class TestJSONLinesExporter(ExporterTestCase):
+
+    def test_export_path(self):
+        path = os.path.join(self.tempdir, "export.jsonl")
+        self.builder.where(
+            sql_builder.ConditionExpSQLPartBuilder("id", "<", 2)
+        )
+        count = exporter.JSONLinesExporter(
+            self.engine, self.builder,
+        ).export(path)
+        self.assertEqual(count, 2)
+        with open(path) as fp:
+            rows = [json.loads(l) for l in fp]
+        self.assertListEqual(rows, [
+            {"id": 0, "name": "name0", "value": 0.0},
+            {"id": 1, "name": "name1", "value": 0.5},
+        ])
+
+    def test_export_null(self):
+        self.engine.get_cursor().execute(
+            'INSERT INTO %s ("id", "name", "value") VALUES (?, ?, ?);'
+            % TestModel.X.table, (10, None, None),
+        )
+        self.builder.where(
+            sql_builder.ConditionExpSQLPartBuilder("id", ">", 8)
+        )
+        stream = io.StringIO()
+        exporter.JSONLinesExporter(self.engine, self.builder).export(stream)
+        self.assertListEqual(
+            [json.loads(l) for l in stream.getvalue().splitlines()], [
+                {"id": 9, "name": "name9", "value": 4.5},
+                {"id": 10, "name": None, "value": None},
+            ],
+        )
+
+    def test_export_gzip_stream(self):
+        stream = io.BytesIO()
+        exporter.JSONLinesExporter(
+            self.engine, self.builder, compress=True,
+        ).export(stream)
+        lines = gzip.decompress(stream.getvalue()).splitlines()
+        self.assertEqual(len(lines), 10)
+        self.assertDictEqual(
+            json.loads(lines[3].decode("utf-8")),
+            {"id": 3, "name": "name3", "value": 1.5},
+        )
@@ -0,0 +1,164 @@
+import gzip
+import io
+import json
+import sqlite3
+from unittest import TestCase
+
+from pichu import exporter, importer, sql_builder
+from pichu.engine import SingleConnectionEngine
+from .utils import TestModel, TestBlobModel
+
+
+class ImporterTestCase(TestCase):
+
+    def setUp(self):
+        self.engine = SingleConnectionEngine(sqlite3.connect(":memory:"))
+        self.engine.execute_write(
+            sql_builder.CreateTableSQLBuilder(TestModel.X)
+        )
+
+    def select_all(self):
+        builder = sql_builder.SelectSQLBuilder(TestModel.X).order_by("id")
+        return [
+            (m.id, m.name, m.value)
+            for m in self.engine.execute(builder)
+        ]
+
+
+class TestCSVImporter(ImporterTestCase):
+
+    def test_load(self):
+        source = io.StringIO(
+            "ID,name,extra\n" + "".join(
+                "%s,name%s,x\n" % (i, i) for i in range(5)
+            )
+        )
+        checkpoints = []
+        offset = importer.CSVImporter(
+            self.engine, TestModel.X, batch_size=2,
+            columns={"ID": "id", "name": "name"},
+            checkpoint=checkpoints.append,
+        ).load(source)
+        self.assertEqual(offset, 5)
+        self.assertListEqual(checkpoints, [2, 4, 5])
+        self.assertListEqual(self.select_all(), [
+            (i, "name%s" % i, 0.0) for i in range(5)
+        ])
+
+    def test_resume(self):
+        source = "id,name,value\n1,a,1\n2,b,2\n2,c,3\n3,d,4\n"
+        loader = importer.CSVImporter(
+            self.engine, TestModel.X, batch_size=2,
+        )
+        with self.assertRaises(sqlite3.IntegrityError):
+            loader.load(io.StringIO(source))
+        self.assertListEqual(self.select_all(), [
+            (1, "a", 1.0), (2, "b", 2.0),
+        ])
+
+        loader.load(io.StringIO(source.replace("2,c", "4,c")), offset=2)
+        self.assertListEqual(self.select_all(), [
+            (1, "a", 1.0), (2, "b", 2.0), (3, "d", 4.0), (4, "c", 3.0),
+        ])
+
+    def test_fast_mode(self):
+        self.engine.execute_write(sql_builder.RawSQLBuilder(
+            TestModel.X,
+            'CREATE INDEX "test_model_name" ON %s ("name");'
+            % TestModel.X.table,
+        ))
+        indexes = []
+
+        def checkpoint(offset):
+            indexes.extend(self.engine.execute(
+                sql_builder.ListIndexSQLBuilder(TestModel.X)
+            ))
+
+        importer.CSVImporter(
+            self.engine, TestModel.X, fast=True, checkpoint=checkpoint,
+        ).load(io.StringIO("id,name\n1,a\n"))
+        self.assertListEqual(indexes, [])
+        self.assertListEqual(
+            [name for name, _ in self.engine.execute(
+                sql_builder.ListIndexSQLBuilder(TestModel.X)
+            )],
+            ["test_model_name"],
+        )
+
+    def test_fast_mode_keeps_unique_indexes(self):
+        self.engine.execute_write(sql_builder.RawSQLBuilder(
+            TestModel.X,
+            'CREATE UNIQUE INDEX "test_model_name" ON %s ("name");'
+            % TestModel.X.table,
+        ))
+        with self.assertRaises(sqlite3.IntegrityError):
+            importer.CSVImporter(
+                self.engine, TestModel.X, fast=True,
+            ).load(io.StringIO("id,name\n1,a\n2,a\n"))
+        self.assertListEqual(self.select_all(), [])
+        self.assertListEqual(
+            [name for name, _ in self.engine.execute(
+                sql_builder.ListIndexSQLBuilder(TestModel.X)
+            )],
+            ["test_model_name"],
+        )
+
+    def test_unknown_column(self):
+        with self.assertRaises(sql_builder.SQLValueError):
+            importer.CSVImporter(
+                self.engine, TestModel.X, columns={"x": "unknown"},
+            )
+
+
+class TestJSONLinesImporter(ImporterTestCase):
+
+    def test_load_gzip(self):
+        source = io.BytesIO(gzip.compress("".join(
+            "%s\n" % json.dumps({"id": i, "name": "n%s" % i, "value": i})
+            for i in range(3)
+        ).encode("utf-8")))
+        importer.JSONLinesImporter(
+            self.engine, TestModel.X, compress=True,
+        ).load(source)
+        self.assertListEqual(self.select_all(), [
+            (i, "n%s" % i, float(i)) for i in range(3)
+        ])
+
+
+class TestBlobRoundTrip(TestCase):
+
+    def setUp(self):
+        self.source = SingleConnectionEngine(sqlite3.connect(":memory:"))
+        self.target = SingleConnectionEngine(sqlite3.connect(":memory:"))
+        for engine in (self.source, self.target):
+            engine.execute_write(
+                sql_builder.CreateTableSQLBuilder(TestBlobModel.X)
+            )
+        self.source.execute_write(
+            sql_builder.InsertSQLBuilder(TestBlobModel.X)
+            .insert(id=1, data=b"\x00\xffblob")
+            .insert(id=2, data=None)
+        )
+
+    def round_trip(self, exporter_class, importer_class):
+        builder = sql_builder.SelectSQLBuilder(TestBlobModel.X)
+        builder.undefer("data").order_by("id")
+        stream = io.StringIO()
+        exporter_class(self.source, builder).export(stream)
+        importer_class(self.target, TestBlobModel.X).load(
+            io.StringIO(stream.getvalue())
+        )
+        return [
+            (m.id, m.data)
+            for m in self.target.execute(builder)
+        ]
+
+    def test_json_lines(self):
+        self.assertListEqual(self.round_trip(
+            exporter.JSONLinesExporter, importer.JSONLinesImporter,
+        ), [(1, b"\x00\xffblob"), (2, None)])
+
+    def test_csv(self):
+        self.assertListEqual(self.round_trip(
+            exporter.CSVExporter, importer.CSVImporter,
+        ), [(1, b"\x00\xffblob"), (2, None)])
@@ -2,7 +2,7 @@ from unittest import TestCase
 
 from pichu import model
 
-from .utils import TestModel
+from .utils import TestModel, TestUniqueModel, TestBlobModel
 
 
 class TestModelMetaAttr(TestCase):
@@ -14,4 +14,26 @@ class TestModelMetaAttr(TestCase):
             TestModel.id, TestModel.name, TestModel.value,
         ))  # sorted by field column
         self.assertIs(TestModel.X.pk, TestModel.id)
+        self.assertTupleEqual(TestModel.X.uniques, ())
         self.assertEqual(TestModel.X.table, TestModel.__table__)
+
+    def test_unique_fields(self):
+        self.assertIsNone(TestUniqueModel.X.pk)
+        self.assertTupleEqual(
+            TestUniqueModel.X.uniques, (TestUniqueModel.code,),
+        )
+
+
+class TestBlobFieldType(TestCase):
+
+    def test_default(self):
+        instance = TestBlobModel(id=5)
+        self.assertIsNone(instance.data)
+        self.assertIsInstance(TestBlobModel.data, model.BlobFieldType)
+
+    def test_not_loaded(self):
+        instance = TestBlobModel._from_database(id=5)
+        self.assertEqual(instance.id, 5)
+        with self.assertRaises(model.DeferredFieldNotLoaded):
+            instance.data
+        self.assertFalse(hasattr(instance, "data"))
@@ -1,7 +1,9 @@
+import sqlite3
 from unittest import TestCase
 
-from pichu import sql_builder
-from .utils import TestModel
+from pichu import model as model_module, sql_builder
+from pichu.engine import SingleConnectionEngine
+from .utils import TestModel, TestUniqueModel, TestBlobModel
 
 
 class TestMergeableSQLPartBuilder(TestCase):
@@ -94,6 +96,132 @@ class TestInsertSQLBuilder(TestCase):
             (1, "test1", 1.0, 2, "test2", TestModel.value.default),
         )
 
+    def test_insert_many(self):
+        builder = sql_builder.InsertSQLBuilder(TestModel.X)
+        builder.insert_many([
+            {"id": "1", "name": "test1", "value": "1"},
+            {"id": 2, "name": "test2"},
+        ])
+        self.assertListEqual(builder.insert_values, [
+            [1, "test1", 1.0], [2, "test2", TestModel.value.default],
+        ])
+
+        with self.assertRaises(sql_builder.SQLValueError):
+            builder.insert_many([{"name": "test3"}])
+
+    def test_split(self):
+        builder = sql_builder.InsertSQLBuilder(TestModel.X)
+        for i in range(5):
+            builder.insert(id=i, name="test%s" % i)
+        chunks = list(builder.split(2))
+        self.assertListEqual(
+            [len(c.insert_values) for c in chunks], [2, 2, 1],
+        )
+        self.assertTupleEqual(
+            chunks[-1]._build_parameters(),
+            (4, "test4", TestModel.value.default),
+        )
+        self.assertEqual(len(builder.insert_values), 5)
+
+
+class TestUpsertSQLBuilder(TestCase):
+
+    def test_upsert(self):
+        builder = sql_builder.UpsertSQLBuilder(TestModel.X)
+        builder.insert(id=1, name="test1", value="1")
+        builder.insert(id=2, name="test2")
+        self.assertEqual(
+            builder._build_sql(),
+            (
+                'INSERT INTO %s ("id", "name", "value") VALUES '
+                '(?, ?, ?), (?, ?, ?) ON CONFLICT ("id") DO UPDATE SET '
+                '"name"=excluded."name";'
+            ) % TestModel.X.table
+        )
+        self.assertTupleEqual(
+            builder._build_parameters(),
+            (1, "test1", 1.0, 2, "test2", TestModel.value.default),
+        )
+
+    def test_upsert_supplied_columns(self):
+        builder = sql_builder.UpsertSQLBuilder(TestModel.X)
+        builder.insert(id=1, name="test1", value="1")
+        self.assertTrue(builder._build_sql().endswith(
+            'DO UPDATE SET "name"=excluded."name", "value"=excluded."value";'
+        ))
+
+        builder = sql_builder.UpsertSQLBuilder(TestUniqueModel.X)
+        builder.insert_many([{"code": "a"}])
+        self.assertTrue(builder._build_sql().endswith(
+            'ON CONFLICT ("code") DO NOTHING;'
+        ))
+
+    def test_do_update(self):
+        builder = sql_builder.UpsertSQLBuilder(TestModel.X)
+        builder.insert(id=1, name="test1").do_update("name")
+        self.assertEqual(
+            builder._build_sql(),
+            (
+                'INSERT INTO %s ("id", "name", "value") VALUES '
+                '(?, ?, ?) ON CONFLICT ("id") DO UPDATE SET '
+                '"name"=excluded."name";'
+            ) % TestModel.X.table
+        )
+
+        builder.do_update()
+        self.assertTrue(builder._build_sql().endswith(
+            'ON CONFLICT ("id") DO NOTHING;'
+        ))
+
+        with self.assertRaises(sql_builder.SQLValueError):
+            builder.do_update("unknown")
+
+    def test_unique_conflict_target(self):
+        builder = sql_builder.UpsertSQLBuilder(TestUniqueModel.X)
+        builder.insert(code="a", count=1)
+        self.assertEqual(
+            builder._build_sql(),
+            (
+                'INSERT INTO %s ("code", "count") VALUES (?, ?) '
+                'ON CONFLICT ("code") DO UPDATE SET "count"=excluded."count";'
+            ) % TestUniqueModel.X.table
+        )
+
+    def test_execute(self):
+        engine = SingleConnectionEngine(sqlite3.connect(":memory:"))
+        engine.execute_write(
+            sql_builder.CreateTableSQLBuilder(TestModel.X)
+        )
+        engine.execute_write(
+            sql_builder.InsertSQLBuilder(TestModel.X)
+            .insert(id=1, name="old1", value=1)
+            .insert(id=2, name="old2", value=2)
+        )
+
+        builder = sql_builder.UpsertSQLBuilder(TestModel.X).do_update("name")
+        for i in range(1, 5):
+            builder.insert(id=i, name="new%s" % i, value=i * 10)
+        for chunk in builder.split(3):
+            engine.execute_write(chunk)
+
+        engine.execute_write(
+            sql_builder.UpsertSQLBuilder(TestModel.X)
+            .insert(id=4, name="sync4")
+        )
+
+        self.assertListEqual(
+            [
+                (m.id, m.name, m.value)
+                for m in engine.execute(
+                    sql_builder.SelectSQLBuilder(TestModel.X).order_by("id")
+                )
+            ],
+            [
+                (1, "new1", 1.0), (2, "new2", 2.0),
+                (3, "new3", 30.0), (4, "sync4", 40.0),
+            ],
+        )
+
 
 class TestUpdateSQLBuilder(TestCase):
 
@@ -159,6 +287,30 @@ class TestSelectSQLBuilder(TestCase):
             ) % TestModel.X.table
         )
 
+    def test_deferred_fields(self):
+        builder = sql_builder.SelectSQLBuilder(TestBlobModel.X)
+        self.assertEqual(
+            builder._build_sql(),
+            'SELECT "id" FROM %s;' % TestBlobModel.X.table
+        )
+        model = builder._parse_db_result((1,))
+        self.assertEqual(model.id, 1)
+        with self.assertRaises(model_module.DeferredFieldNotLoaded):
+            model.data
+
+        builder.undefer("data")
+        self.assertEqual(
+            builder._build_sql(),
+            'SELECT "data", "id" FROM %s;' % TestBlobModel.X.table
+        )
+        model = builder._parse_db_result((b"abc", 1))
+        self.assertEqual(model.data, b"abc")
+        model = builder._parse_db_result((u"abc", 1))
+        self.assertEqual(model.data, b"abc")
+
+        with self.assertRaises(sql_builder.SQLValueError):
+            builder.undefer("unknown")
+
     def test_order_by(self):
         builder = sql_builder.SelectSQLBuilder(TestModel.X)
         builder.order_by("id", "-name", "+value")
@@ -182,3 +334,23 @@ class TestCreateTableSQLBuilder(TestCase):
                 '"value" DOUBLE DEFAULT 0.0 );'
             ) % TestModel.X.table
         )
+
+    def test_create_unique(self):
+        builder = sql_builder.CreateTableSQLBuilder(TestUniqueModel.X)
+        self.assertEqual(
+            builder._build_sql(),
+            (
+                'CREATE TABLE IF NOT EXISTS "%s" ( '
+                '"code" TEXT UNIQUE, "count" INT DEFAULT 0 );'
+            ) % TestUniqueModel.X.table
+        )
+
+    def test_create_blob(self):
+        builder = sql_builder.CreateTableSQLBuilder(TestBlobModel.X)
+        self.assertEqual(
+            builder._build_sql(),
+            (
+                'CREATE TABLE IF NOT EXISTS "%s" ( '
+                '"data" BLOB DEFAULT NULL, "id" INT PRIMARY KEY );'
+            ) % TestBlobModel.X.table
+        )
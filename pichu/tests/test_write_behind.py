@@ -0,0 +1,237 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from unittest import TestCase
+
+from pichu import sql_builder, write_behind
+from pichu.engine import SingleConnectionEngine
+from .utils import TestModel
+
+
+class TestWriteBehindQueue(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, "test.db")
+        self.engine = SingleConnectionEngine(sqlite3.connect(self.path))
+        self.engine.execute_write(
+            sql_builder.CreateTableSQLBuilder(TestModel.X)
+        )
+        self.queue = None
+
+    def tearDown(self):
+        if self.queue is not None and not self.queue.closed:
+            self.queue.close()
+        self.engine.close()
+        shutil.rmtree(self.tempdir)
+
+    def connect(self):
+        return sqlite3.connect(
+            self.path, check_same_thread=False, timeout=0.1,
+        )
+
+    def enable(self, **kwargs):
+        kwargs.setdefault("flush_interval", 60)
+        kwargs.setdefault("flush_size", 100)
+        self.queue = self.engine.enable_write_behind(self.connect, **kwargs)
+        return self.queue
+
+    def insert(self, id, name="test"):
+        return sql_builder.InsertSQLBuilder(TestModel.X).insert(
+            id=id, name=name,
+        )
+
+    def update(self, id, **kwargs):
+        return sql_builder.UpdateSQLBuilder(TestModel.X).update(
+            **kwargs
+        ).where(sql_builder.ConditionExpSQLPartBuilder("id", "=", id))
+
+    def select_all(self):
+        builder = sql_builder.SelectSQLBuilder(TestModel.X).order_by("id")
+        return [
+            (m.id, m.name, m.value)
+            for m in self.engine.execute(builder)
+        ]
+
+    def test_coalesce(self):
+        queue = self.enable()
+        broad = sql_builder.UpdateSQLBuilder(TestModel.X).update(value=2)
+        statements = queue._coalesce([
+            self.insert(1),
+            self.insert(2),
+            self.update(1, name="a"),
+            self.update(1, value=1),
+            self.update(2, name="b"),
+            broad,
+            self.update(2, value=3),
+        ])
+        self.assertListEqual(
+            [type(s) for s in statements], [
+                sql_builder.InsertSQLBuilder,
+                sql_builder.UpdateSQLBuilder,
+                sql_builder.UpdateSQLBuilder,
+                sql_builder.UpdateSQLBuilder,
+                sql_builder.UpdateSQLBuilder,
+            ],
+        )
+        self.assertListEqual(statements[0].insert_values, [
+            [1, "test", 0.0], [2, "test", 0.0],
+        ])
+        self.assertListEqual(
+            list(statements[1].update_value.items()),
+            [("name", "a"), ("value", 1.0)],
+        )
+        self.assertIs(statements[3], broad)
+
+    def test_update_barrier(self):
+        queue = self.enable()
+        queue.put(self.insert(1))
+        queue.put(sql_builder.UpdateSQLBuilder(TestModel.X).update(
+            name="broad",
+        ).where(sql_builder.ConditionExpSQLPartBuilder("value", ">", -1)))
+        queue.put(self.update(1, name="pk"))
+        queue.flush()
+        self.assertListEqual(self.select_all(), [(1, "pk", 0.0)])
+
+    def test_update_before_insert(self):
+        queue = self.enable()
+        queue.put(self.update(2, name="upd"))
+        queue.put(self.insert(2, name="ins"))
+        queue.flush()
+        self.assertListEqual(self.select_all(), [(2, "ins", 0.0)])
+
+    def test_flush(self):
+        queue = self.enable()
+        queue.put(self.insert(1))
+        queue.put(self.insert(2))
+        queue.put(self.update(1, name="a"))
+        queue.put(self.update(1, value=3))
+        self.assertEqual(queue.depth, 4)
+        self.assertListEqual(self.select_all(), [])
+
+        self.assertEqual(queue.flush(), 4)
+        self.assertListEqual(self.select_all(), [
+            (1, "a", 3.0), (2, "test", 0.0),
+        ])
+
+        metrics = queue.metrics()
+        self.assertEqual(metrics["depth"], 0)
+        self.assertEqual(metrics["flushed_count"], 4)
+        self.assertEqual(metrics["flush_count"], 1)
+        self.assertIsNotNone(metrics["last_flush_latency"])
+        self.assertEqual(queue.flush(), 0)
+
+    def test_flush_on_size(self):
+        queue = self.enable(flush_size=2)
+        queue.put(self.insert(1))
+        queue.put(self.insert(2))
+        deadline = time.time() + 5
+        while queue.metrics()["flushed_count"] < 2:
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.01)
+        self.assertEqual(len(self.select_all()), 2)
+
+    def test_flush_on_interval(self):
+        queue = self.enable(flush_interval=0.01)
+        queue.put(self.insert(1))
+        deadline = time.time() + 5
+        while queue.metrics()["flushed_count"] < 1:
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.01)
+
+    def test_backpressure(self):
+        queue = self.enable(max_size=1)
+        queue.put(self.insert(1))
+        with self.assertRaises(write_behind.WriteBehindQueueFull):
+            queue.put(self.insert(2), block=False)
+        with self.assertRaises(write_behind.WriteBehindQueueFull):
+            queue.put(self.insert(2), timeout=0.01)
+        with self.assertRaises(TypeError):
+            queue.put(sql_builder.DeleteSQLBuilder(TestModel.X))
+
+    def test_failed_flush(self):
+        errors = []
+        queue = self.enable(on_error=lambda b, e: errors.append((b, e)))
+        duplicate = self.insert(1, name="dup")
+        queue.put(self.insert(1))
+        queue.put(self.insert(2))
+        queue.put(duplicate)
+        queue.put(self.update(2, name="a"))
+        self.assertEqual(queue.flush(), 3)
+        self.assertListEqual(self.select_all(), [
+            (1, "test", 0.0), (2, "a", 0.0),
+        ])
+
+        self.assertEqual(len(errors), 1)
+        self.assertIs(errors[0][0], duplicate)
+        self.assertIsInstance(errors[0][1], sqlite3.IntegrityError)
+        self.assertListEqual(queue.dead_letters, errors)
+
+        metrics = queue.metrics()
+        self.assertEqual(metrics["depth"], 0)
+        self.assertEqual(metrics["dead_letter_count"], 1)
+        self.assertGreater(metrics["failed_flush_count"], 0)
+
+        queue.put(self.insert(3))
+        self.assertEqual(queue.flush(), 1)
+
+    def test_raising_on_error(self):
+        def on_error(builder, error):
+            raise ValueError("callback")
+
+        queue = self.enable(on_error=on_error)
+        queue.put(self.insert(1))
+        queue.put(self.insert(1, name="dup"))
+        queue.put(self.insert(2))
+        queue.put(self.insert(3))
+        self.assertEqual(queue.flush(), 3)
+        self.assertListEqual(
+            [r[0] for r in self.select_all()], [1, 2, 3],
+        )
+        self.assertEqual(len(queue.dead_letters), 1)
+        self.assertIsInstance(queue.last_error, ValueError)
+        self.assertEqual(queue.metrics()["flush_count"], 1)
+
+    def test_close(self):
+        queue = self.enable()
+        self.assertIs(self.engine.enable_write_behind(self.connect), queue)
+        queue.put(self.insert(1))
+        queue.close()
+        self.queue = None
+        self.assertListEqual(self.select_all(), [(1, "test", 0.0)])
+        with self.assertRaises(write_behind.WriteBehindQueueClosed):
+            queue.put(self.insert(2))
+
+        self.queue = self.engine.enable_write_behind(self.connect)
+        self.assertIsNot(self.queue, queue)
+
+    def test_engine_close(self):
+        queue = self.enable()
+        queue.put(self.insert(1))
+        self.engine.close()
+        self.assertTrue(queue.closed)
+        self.assertEqual(queue.depth, 0)
+
+        self.engine = SingleConnectionEngine(sqlite3.connect(self.path))
+        self.assertListEqual(self.select_all(), [(1, "test", 0.0)])
+
+    def test_own_connection(self):
+        queue = self.enable()
+        self.assertIsNot(queue.engine.connection, self.engine.connection)
+
+        self.engine.execute_write(self.insert(50))
+        for i in range(4):
+            queue.put(self.insert(i))
+        self.assertEqual(queue.flush(), 0)
+        metrics = queue.metrics()
+        self.assertEqual(metrics["depth"], 4)
+        self.assertEqual(metrics["failed_flush_count"], 1)
+        self.assertListEqual(queue.dead_letters, [])
+
+        self.engine.connection.commit()
+        self.assertEqual(queue.flush(), 4)
+        self.assertListEqual(
+            [r[0] for r in self.select_all()], [0, 1, 2, 3, 50],
+        )
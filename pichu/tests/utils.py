@@ -7,3 +7,17 @@ class TestModel(model.BaseModel):
     id = model.IntFieldType(is_primary_key=True)
     value = model.FloatFieldType(default=0)
     name = model.TextFieldType()
+
+
+class TestUniqueModel(model.BaseModel):
+    __table__ = "test_unique_model"
+
+    code = model.TextFieldType(is_unique=True)
+    count = model.IntFieldType(default=0)
+
+
+class TestBlobModel(model.BaseModel):
+    __table__ = "test_blob_model"
+
+    id = model.IntFieldType(is_primary_key=True)
+    data = model.BlobFieldType(default=None)
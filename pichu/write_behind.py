@@ -0,0 +1,288 @@
+import threading
+import time
+from collections import OrderedDict
+
+from pichu import sql_builder
+
+
+class WriteBehindQueueFull(Exception):
+    pass
+
+
+class WriteBehindQueueClosed(Exception):
+    pass
+
+
+class WriteBehindQueue(object):
+    """Buffer insert and update builders and write them from a thread.
+
+    Pending builders are flushed in one transaction once `flush_size` of
+    them are queued or every `flush_interval` seconds. On flush, successive
+    inserts into a table are merged into chunked multi-row statements and
+    successive updates of the same primary key are folded together, writes
+    are otherwise kept in the order they were queued.
+
+    A batch hit by a transient error, such as a locked database, is queued
+    again and retried after `flush_interval`. Any other failing batch is
+    split and retried, builders which still fail on their own are moved
+    to `dead_letters` and passed to `on_error`.
+
+    The queue owns `engine` and closes it on `close()`, it must not be
+    shared with other code. Flushes run from the queue thread and from
+    callers of `flush()`, serialized by the queue, so a sqlite3 connection
+    must be opened with `check_same_thread=False`.
+    """
+
+    def __init__(
+        self, engine, max_size=10000, flush_size=500, flush_interval=1.0,
+        on_error=None,
+    ):
+        super(WriteBehindQueue, self).__init__()
+        self.engine = engine
+        self.on_error = on_error
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self._pending = []
+        self._closed = False
+        self._backoff = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._wakeup = threading.Condition(self._lock)
+
+        self.flushed_count = 0
+        self.flush_count = 0
+        self.failed_flush_count = 0
+        self.last_flush_latency = None
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+        self.last_error = None
+        self.dead_letters = []
+
+        self._thread = threading.Thread(
+            target=self._run, name="pichu-write-behind",
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def depth(self):
+        return len(self._pending)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "depth": len(self._pending),
+                "max_size": self.max_size,
+                "flushed_count": self.flushed_count,
+                "flush_count": self.flush_count,
+                "failed_flush_count": self.failed_flush_count,
+                "dead_letter_count": len(self.dead_letters),
+                "last_flush_latency": self.last_flush_latency,
+                "max_flush_latency": self.max_flush_latency,
+                "avg_flush_latency": (
+                    self.total_flush_latency / self.flush_count
+                    if self.flush_count else None
+                ),
+            }
+
+    def put(self, builder, block=True, timeout=None):
+        """Queue a builder, waiting for room when the queue is full.
+
+        Raises `WriteBehindQueueFull` if no room is available without
+        blocking or before `timeout` expires.
+        """
+        if not isinstance(builder, (
+            sql_builder.InsertSQLBuilder, sql_builder.UpdateSQLBuilder,
+        )):
+            raise TypeError("unsupported builder: %r" % builder)
+
+        with self._lock:
+            deadline = None if timeout is None else time.time() + timeout
+            while not self._closed and len(self._pending) >= self.max_size:
+                if not block:
+                    raise WriteBehindQueueFull()
+                if deadline is None:
+                    self._not_full.wait()
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise WriteBehindQueueFull()
+                    self._not_full.wait(remaining)
+
+            if self._closed:
+                raise WriteBehindQueueClosed()
+            self._pending.append(builder)
+            if len(self._pending) >= self.flush_size:
+                self._wakeup.notify()
+
+    def _pk_update_key(self, builder):
+        condition = builder.where_condition
+        pk = builder.model_meta.pk
+        if (
+            type(builder) is not sql_builder.UpdateSQLBuilder or
+            pk is None or
+            not isinstance(
+                condition, sql_builder.ConditionExpSQLPartBuilder
+            ) or
+            condition.field != pk.column or
+            condition.operator != "="
+        ):
+            return None
+        try:
+            hash(condition.value)
+        except TypeError:
+            return None
+        return builder.model_meta.table, condition.value
+
+    def _coalesce(self, builders):
+        """Fold builders into statements without reordering writes.
+
+        A builder is folded into the previous statement of its table only
+        when that statement is a merged insert, or an update of the same
+        primary key. Any other builder is kept as is and acts as a
+        barrier for later folding on its table.
+        """
+        statements = []
+        last = {}
+        for builder in builders:
+            table = builder.model_meta.table
+            kind, key, statement = last.get(table, (None, None, None))
+
+            if type(builder) is sql_builder.InsertSQLBuilder:
+                if kind != "insert":
+                    statement = sql_builder.InsertSQLBuilder(
+                        builder.model_meta
+                    )
+                    statements.append(statement)
+                    last[table] = ("insert", None, statement)
+                statement.insert_values.extend(builder.insert_values)
+                continue
+
+            pk_key = self._pk_update_key(builder)
+            if pk_key is None:
+                statements.append(builder)
+                last[table] = (None, None, builder)
+            elif kind == "update" and key == pk_key:
+                statement.update_value.update(builder.update_value)
+            else:
+                statement = sql_builder.UpdateSQLBuilder(builder.model_meta)
+                statement.update_value.update(builder.update_value)
+                statement.where_condition = builder.where_condition
+                statements.append(statement)
+                last[table] = ("update", pk_key, statement)
+
+        result = []
+        for statement in statements:
+            if type(statement) is sql_builder.InsertSQLBuilder:
+                result.extend(statement.split())
+            else:
+                result.append(statement)
+        return result
+
+    def _write(self, builders):
+        """Write builders in order, return the count written and the
+        builders left to retry after a transient error."""
+        try:
+            with self.engine.transaction():
+                for statement in self._coalesce(builders):
+                    self.engine.execute_write(statement)
+        except Exception as err:
+            with self._lock:
+                self.failed_flush_count += 1
+                self.last_error = err
+            if self.engine.is_transient_error(err):
+                return 0, builders
+            if len(builders) > 1:
+                middle = len(builders) // 2
+                written, retry = self._write(builders[:middle])
+                if retry:
+                    return written, retry + builders[middle:]
+                more, retry = self._write(builders[middle:])
+                return written + more, retry
+            with self._lock:
+                self.dead_letters.append((builders[0], err))
+            if self.on_error:
+                try:
+                    self.on_error(builders[0], err)
+                except Exception as callback_err:
+                    # the builder is already dead-lettered, keep writing
+                    # the rest of the batch
+                    with self._lock:
+                        self.last_error = callback_err
+            return 0, []
+        return len(builders), []
+
+    def flush(self):
+        """Write all pending builders now, return how many were written.
+
+        Builders hit by a transient error, such as a locked database, are
+        queued again at the head. Otherwise a failing batch is split and
+        the halves are retried in order, builders failing on their own go
+        to `dead_letters`.
+        """
+        with self._flush_lock:
+            with self._lock:
+                builders, self._pending = self._pending, []
+                self._not_full.notify_all()
+            if not builders:
+                return 0
+
+            start = time.time()
+            written, retry = self._write(builders)
+            latency = time.time() - start
+            with self._lock:
+                self._pending[:0] = retry
+                self._backoff = bool(retry)
+                self.flushed_count += written
+                self.flush_count += 1
+                self.last_flush_latency = latency
+                self.total_flush_latency += latency
+                self.max_flush_latency = max(self.max_flush_latency, latency)
+            return written
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._closed and (
+                    self._backoff or len(self._pending) < self.flush_size
+                ):
+                    self._wakeup.wait(self.flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                # keep the thread alive on unexpected errors, back off
+                # until the next interval
+                with self._lock:
+                    if not self._closed:
+                        self._wakeup.wait(self.flush_interval)
+
+    def close(self, timeout=None):
+        """Stop accepting builders, stop the thread and drain the queue.
+
+        Transient failures are retried every `flush_interval` until the
+        queue is drained or `timeout` expires.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify_all()
+            self._not_full.notify_all()
+        self._thread.join(timeout)
+        try:
+            self.flush()
+            while self._pending and (
+                deadline is None or time.time() < deadline
+            ):
+                time.sleep(self.flush_interval)
+                self.flush()
+        finally:
+            self.engine.close()